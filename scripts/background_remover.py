@@ -1,77 +1,215 @@
 """
-background_remover.py – Removes the black background from a Quran recitation
-video using FFmpeg's lumakey filter, producing a transparent overlay file.
+background_remover.py – Builds the FFmpeg lumakey filter that removes the
+black background from a Quran recitation video.
+
+The filter is no longer rendered to an intermediate file: composer.py applies
+it inside the same filter_complex that overlays the speaker on the Pexels
+background, so the foreground is decoded once and encoded once.
+
+To keep the overlay cheap, detect_overlay_crop() finds the bounding box of
+the non-black content so only that region is keyed and blended. The crop is
+only applied when the box is much smaller than the frame; otherwise the
+detection pass would cost more than it saves.
 
 Input:  tmp/source_video.mp4  (black background, white text/speaker)
-Output: tmp/transparent.mov   (QuickTime RLE with alpha channel)
+Output: lumakey filter chain producing yuva420p frames with alpha
 """
 
+import json
+import math
 import os
-import subprocess
+import re
+
+import process_runner
+from process_runner import DEBUG, FILTER_THREADS
 
 TMP_DIR = os.path.join(os.path.dirname(__file__), "..", "tmp")
+# Under tmp/cache/ so it survives cleanup: a video whose upload failed is not
+# marked used and is retried on the next run without another detection pass
+CROP_CACHE_PATH = os.path.join(TMP_DIR, "cache", "overlay_crop.json")
+FFMPEG = process_runner.resolve_tool("ffmpeg")
 
+# Overlay canvas size (matches composer.TARGET_WIDTH/TARGET_HEIGHT)
+CANVAS_WIDTH = 1080
+CANVAS_HEIGHT = 1920
 
-def remove_background(
-    input_path: str | None = None,
-    output_path: str | None = None,
-    threshold: float = 0.15,
-    tolerance: float = 0.20,
-    softness: float = 0.10,
+_CROP_RE = re.compile(r"crop=(\d+):(\d+):(\d+):(\d+)")
+_STREAM_SIZE_RE = re.compile(r"Stream #0:\d+.*: Video: .*?, (\d{2,5})x(\d{2,5})")
+_ROTATION_RE = re.compile(r"rotation of (-?\d+(?:\.\d+)?) degrees")
+
+# Only crop when the content box covers at most this fraction of the canvas
+CROP_MAX_AREA_RATIO = 0.5
+# Canvas pixels added around the box to cover the scaler's edge bleed
+CROP_MARGIN = 8
+
+
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_TOLERANCE = 0.20
+DEFAULT_SOFTNESS = 0.10
+
+
+def _format_lumakey(threshold: float, tolerance: float, softness: float) -> str:
+    # FFmpeg lumakey filter:
+    # lumakey=threshold:tolerance:softness
+    # threshold=0.15 → pixels with luma < 0.15 become transparent
+    # tolerance=0.20 → extend the key range
+    # softness=0.10  → smooth edges
+    return (
+        f"lumakey=threshold={threshold}:tolerance={tolerance}:softness={softness},"
+        f"format=yuva420p"
+    )
+
+
+# The default chain is built once at import; only overrides are formatted per call
+_DEFAULT_LUMAKEY = _format_lumakey(DEFAULT_THRESHOLD, DEFAULT_TOLERANCE, DEFAULT_SOFTNESS)
+
+
+def build_lumakey_filter(
+    threshold: float = DEFAULT_THRESHOLD,
+    tolerance: float = DEFAULT_TOLERANCE,
+    softness: float = DEFAULT_SOFTNESS,
 ) -> str:
     """
-    Apply FFmpeg lumakey filter to remove the black background.
+    Return the FFmpeg lumakey filter chain that removes the black background.
 
     The lumakey filter treats dark pixels as transparent, keeping bright
-    pixels (white text, speaker) fully opaque.
+    pixels (white text, speaker) fully opaque. The chain ends in yuva420p so
+    the overlay filter receives an explicit alpha plane.
 
     Args:
-        input_path:  Path to source video. Defaults to tmp/source_video.mp4.
-        output_path: Path for output. Defaults to tmp/transparent.mov.
         threshold:   Luma level treated as key color (0=black, 1=white). Default 0.15.
         tolerance:   Range around threshold to also key out. Default 0.20.
         softness:    Edge softness for smooth blending. Default 0.10.
 
     Returns:
-        Absolute path to the transparent .mov file.
+        Filter chain string, e.g. "lumakey=threshold=0.15:...,format=yuva420p".
+    """
+    if (threshold, tolerance, softness) == (DEFAULT_THRESHOLD, DEFAULT_TOLERANCE, DEFAULT_SOFTNESS):
+        return _DEFAULT_LUMAKEY
+    return _format_lumakey(threshold, tolerance, softness)
+
+
+def _load_crop_cache() -> dict:
+    if not os.path.exists(CROP_CACHE_PATH):
+        return {}
+    with open(CROP_CACHE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_crop_cache(cache: dict) -> None:
+    """Persist the crop cache atomically (write temp file, then rename)."""
+    os.makedirs(os.path.dirname(CROP_CACHE_PATH), exist_ok=True)
+    tmp_path = CROP_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, separators=(",", ":"))
+    os.replace(tmp_path, CROP_CACHE_PATH)
+
+
+def _to_canvas(
+    crop: tuple[int, int, int, int],
+    source_size: tuple[int, int],
+) -> tuple[int, int, int, int]:
+    """
+    Map a crop box from source pixels to the 1080x1920 canvas the composer
+    scales the source to, padded by CROP_MARGIN and aligned to even pixels.
+    """
+    w, h, x, y = crop
+    sx = CANVAS_WIDTH / source_size[0]
+    sy = CANVAS_HEIGHT / source_size[1]
+    left = max(0, (math.floor(x * sx) - CROP_MARGIN) // 2 * 2)
+    top = max(0, (math.floor(y * sy) - CROP_MARGIN) // 2 * 2)
+    right = min(CANVAS_WIDTH, -(-(math.ceil((x + w) * sx) + CROP_MARGIN) // 2) * 2)
+    bottom = min(CANVAS_HEIGHT, -(-(math.ceil((y + h) * sy) + CROP_MARGIN) // 2) * 2)
+    return right - left, bottom - top, left, top
+
+
+def detect_overlay_crop(
+    video_id: str,
+    input_path: str | None = None,
+) -> tuple[int, int, int, int] | None:
+    """
+    Detect the bounding box of the non-black content of the source video.
+
+    Runs FFmpeg's cropdetect over the whole clip at the source's native
+    resolution (reset=0 so the box grows to cover every frame) and maps the
+    box to the 1080x1920 canvas. The box is only returned when it covers at
+    most CROP_MAX_AREA_RATIO of the canvas; a nearly full-frame crop would
+    not pay for the detection pass. The result is cached in
+    tmp/cache/overlay_crop.json keyed by video_id.
+
+    Args:
+        video_id:   YouTube video ID, used as the cache key.
+        input_path: Path to source video. Defaults to tmp/source_video.mp4.
+
+    Returns:
+        (width, height, x, y) in canvas coordinates, or None when the whole
+        canvas should be used (or nothing could be detected).
 
     Raises:
         RuntimeError: If FFmpeg fails.
     """
     if input_path is None:
         input_path = os.path.join(TMP_DIR, "source_video.mp4")
-    if output_path is None:
-        output_path = os.path.join(TMP_DIR, "transparent.mov")
 
-    # Remove stale output
-    if os.path.exists(output_path):
-        os.remove(output_path)
-
-    # FFmpeg lumakey filter:
-    # lumakey=threshold:tolerance:softness
-    # threshold=0.15 → pixels with luma < 0.15 become transparent
-    # tolerance=0.20 → extend the key range
-    # softness=0.10  → smooth edges
-    vf_filter = f"lumakey=threshold={threshold}:tolerance={tolerance}:softness={softness}"
+    cache = _load_crop_cache()
+    if video_id in cache:
+        crop = cache[video_id]
+        print(f"[background_remover] Using cached overlay crop for {video_id}: {crop}")
+        return tuple(crop) if crop else None
 
     cmd = [
-        "ffmpeg",
-        "-y",                    # Overwrite output without asking
+        FFMPEG,
+        "-hide_banner",
+        "-nostats",
+        "-filter_threads", FILTER_THREADS,
         "-i", input_path,
-        "-vf", vf_filter,
-        "-c:v", "qtrle",         # QuickTime RLE codec supports alpha channel
-        "-an",                   # No audio in the overlay (audio handled separately)
-        output_path,
+        "-an",
+        "-vf", "cropdetect=limit=16:round=2:reset=0",
+        "-f", "null",
+        "-",
     ]
 
-    print(f"[background_remover] Running FFmpeg lumakey filter...")
-    print(f"[background_remover] Command: {' '.join(cmd)}")
+    print(f"[background_remover] Detecting overlay bounding box (cropdetect)...")
+    if DEBUG:
+        print(f"[background_remover] Command: {' '.join(cmd)}")
+
+    # FFmpeg logs the input size (and any rotation) before the first frame;
+    # cropdetect then logs one "crop=w:h:x:y" per frame, and with reset=0 the
+    # last one is the union of all frames.
+    source_size = []
+    rotation = []
+    last_match = []
+
+    def on_line(line: str) -> None:
+        match = _CROP_RE.search(line)
+        if match:
+            last_match[:] = match.groups()
+            return
+        if not source_size:
+            size = _STREAM_SIZE_RE.search(line)
+            if size:
+                source_size[:] = (int(size.group(1)), int(size.group(2)))
+        rotated = _ROTATION_RE.search(line)
+        if rotated:
+            rotation[:] = [float(rotated.group(1))]
+
+    process_runner.run(cmd, tag="background_remover", tool="FFmpeg cropdetect", on_line=on_line)
+
+    crop = None
+    if last_match and source_size:
+        width, height = source_size
+        # Autorotation is applied before the filters, so cropdetect sees the
+        # rotated frame while the stream line reports the coded size
+        if rotation and round(abs(rotation[0])) % 180 == 90:
+            width, height = height, width
+        detected = tuple(int(v) for v in last_match)
+        if detected[0] > 0 and detected[1] > 0:
+            crop = _to_canvas(detected, (width, height))
+            if crop[0] * crop[1] > CROP_MAX_AREA_RATIO * CANVAS_WIDTH * CANVAS_HEIGHT:
+                crop = None
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"[background_remover] FFmpeg failed:\n{result.stderr}"
-        )
+    cache[video_id] = list(crop) if crop else None
+    _save_crop_cache(cache)
 
-    print(f"[background_remover] Transparent overlay saved to: {output_path}")
-    return output_path
+    print(f"[background_remover] Overlay crop for {video_id}: {crop or 'full frame'}")
+    return crop
@@ -1,44 +1,279 @@
 """
-composer.py – Composes the final vertical Quran Short video by overlaying
-the transparent foreground on the Pexels background and mixing in the audio.
+composer.py – Composes the final vertical Quran Short video by keying out the
+black background of the source video, overlaying it on the Pexels background
+and mixing in the audio – all in a single FFmpeg pass.
 
 Pipeline:
-  background.mp4 (9:16 background)
-  + transparent.mov (lumakey overlay)
+  source_video.mp4 (black background, lumakey → alpha foreground)
+  + background.mp4 (9:16 background)
   + source_audio.m4a (original Quran recitation audio)
   → final.mp4 (1080x1920, H.264/AAC)
 """
 
+import functools
 import os
 import subprocess
 
+import process_runner
+from process_runner import DEBUG, FILTER_THREADS
+from background_remover import (
+    DEFAULT_SOFTNESS,
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOLERANCE,
+    build_lumakey_filter,
+)
+
 TMP_DIR = os.path.join(os.path.dirname(__file__), "..", "tmp")
+FFMPEG = process_runner.resolve_tool("ffmpeg")
+FFPROBE = process_runner.resolve_tool("ffprobe")
 
 TARGET_WIDTH = 1080
 TARGET_HEIGHT = 1920
 
+# Pre-scaled backgrounds, keyed by Pexels ID. tmp/cache/ survives cleanup and
+# is persisted between workflow runs, so high-performing backgrounds that are
+# re-used (see pexels_fetcher) are scaled only once.
+BG_CACHE_DIR = os.path.join(TMP_DIR, "cache", "bg")
+BG_CACHE_MAX_FILES = 10
+
+BACKGROUND_SCALE = (
+    f"scale={TARGET_WIDTH}:{TARGET_HEIGHT}:force_original_aspect_ratio=increase,"
+    f"crop={TARGET_WIDTH}:{TARGET_HEIGHT}"
+)
+
+# H.264 encoder: "auto" picks the first working one of nvenc → vaapi → libx264.
+# Set VIDEO_ENCODER=nvenc|vaapi|libx264 to force a specific encoder.
+VIDEO_ENCODER = os.environ.get("VIDEO_ENCODER", "auto").lower()
+VAAPI_DEVICE = os.environ.get("VAAPI_DEVICE", "/dev/dri/renderD128")
+
+
+def _probe_encoder(encoder: str) -> bool:
+    """Encode a few blank frames to check the hardware encoder really works."""
+    input_args, filter_tail, output_args = _encoder_args(encoder)
+    cmd = [
+        FFMPEG, "-hide_banner", "-loglevel", "error",
+        *input_args,
+        "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.2",
+    ]
+    if filter_tail:
+        cmd += ["-vf", filter_tail]
+    cmd += [*output_args, "-f", "null", "-"]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def select_encoder() -> str:
+    """
+    Return the H.264 encoder to use: "nvenc", "vaapi" or "libx264".
+
+    Stock FFmpeg builds list h264_nvenc/h264_vaapi even on machines without a
+    GPU, so each candidate is verified with a tiny test encode before use.
+    """
+    if VIDEO_ENCODER != "auto":
+        return VIDEO_ENCODER
+
+    try:
+        encoders = subprocess.run(
+            [FFMPEG, "-hide_banner", "-encoders"],
+            capture_output=True, text=True,
+        ).stdout
+    except OSError:
+        encoders = ""
+
+    if "h264_nvenc" in encoders and _probe_encoder("nvenc"):
+        return "nvenc"
+    if "h264_vaapi" in encoders and os.path.exists(VAAPI_DEVICE) and _probe_encoder("vaapi"):
+        return "vaapi"
+    return "libx264"
+
+
+def _encoder_args(encoder: str) -> tuple[list[str], str, list[str]]:
+    """
+    Return (global/input args, filter chain suffix, output args) for an encoder.
+
+    lumakey has no CUDA/VAAPI implementation, so keying and overlay stay on
+    the CPU; the hardware encoders take over the H.264 encode, which is the
+    heaviest stage of the pipeline.
+    """
+    if encoder == "nvenc":
+        return (
+            [],
+            "",
+            ["-c:v", "h264_nvenc", "-preset", "p5", "-rc", "vbr", "-cq", "23", "-b:v", "0"],
+        )
+    if encoder == "vaapi":
+        # Frames are uploaded to the VAAPI surface at the end of the graph
+        return (
+            ["-vaapi_device", VAAPI_DEVICE],
+            "format=nv12,hwupload",
+            ["-c:v", "h264_vaapi", "-qp", "23"],
+        )
+    return (
+        [],
+        "",
+        [
+            "-c:v", "libx264", "-preset", "fast", "-crf", "23",
+            "-threads", "0",
+            "-x264-params", "threads=auto:lookahead-threads=2",
+        ],
+    )
+
+
+def _audio_args(audio_path: str) -> list[str]:
+    """
+    Return the audio codec args: stream-copy AAC sources (yt-dlp's m4a), and
+    only re-encode to AAC when the fallback format returned something else.
+    """
+    result = subprocess.run(
+        [
+            FFPROBE, "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name",
+            "-of", "csv=p=0",
+            audio_path,
+        ],
+        capture_output=True, text=True,
+    )
+    codec = result.stdout.strip()
+    if codec == "aac":
+        return ["-c:a", "copy"]
+    print(f"[composer] Source audio is '{codec or 'unknown'}', re-encoding to AAC.")
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+
+def prune_bg_cache(keep: set[str] | frozenset[str] = frozenset()) -> None:
+    """
+    Trim the background cache to the BG_CACHE_MAX_FILES most recently used files.
+
+    Call this only once the backgrounds of a batch have been composed: files
+    in keep (the batch's own backgrounds) are never removed, even when the
+    batch alone exceeds the limit.
+
+    Args:
+        keep: Cache paths that must survive, e.g. the current batch's backgrounds.
+    """
+    if not os.path.isdir(BG_CACHE_DIR):
+        return
+    keep = {os.path.abspath(path) for path in keep}
+    entries = [
+        os.path.join(BG_CACHE_DIR, name)
+        for name in os.listdir(BG_CACHE_DIR)
+        if name.endswith(".mp4")
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[BG_CACHE_MAX_FILES:]:
+        if os.path.abspath(path) not in keep:
+            os.remove(path)
+
+
+def _bg_cache_path(pexels_id: str) -> str:
+    return os.path.join(BG_CACHE_DIR, f"{pexels_id}_{TARGET_WIDTH}x{TARGET_HEIGHT}.mp4")
+
+
+def cached_background(pexels_id: str) -> str | None:
+    """
+    Return the pre-scaled cache path for a Pexels ID if it already exists.
+
+    Lets callers skip downloading the raw Pexels video on a cache hit.
+    A hit is marked as recently used for prune_bg_cache().
+
+    Returns:
+        Path to tmp/cache/bg/{pexels_id}_1080x1920.mp4, or None on a miss.
+    """
+    cache_path = _bg_cache_path(pexels_id)
+    if not os.path.exists(cache_path):
+        return None
+    os.utime(cache_path)
+    return cache_path
+
+
+def prescale_background(background_path: str, pexels_id: str) -> str:
+    """
+    Return a 1080x1920 copy of a background, scaling it at most once per ID.
+
+    Args:
+        background_path: Path to the downloaded Pexels video.
+        pexels_id:       Pexels video ID, used as the cache key.
+
+    Returns:
+        Path to the cached tmp/cache/bg/{pexels_id}_1080x1920.mp4.
+
+    Raises:
+        RuntimeError: If FFmpeg fails.
+    """
+    cached = cached_background(pexels_id)
+    if cached:
+        print(f"[composer] Using pre-scaled background: {cached}")
+        return cached
+
+    os.makedirs(BG_CACHE_DIR, exist_ok=True)
+    cache_path = _bg_cache_path(pexels_id)
+
+    # Write to a temp name first so an interrupted run never leaves a
+    # truncated file in the cache
+    part_path = cache_path + ".part.mp4"
+    cmd = [
+        FFMPEG,
+        "-y",
+        "-loglevel", "error",
+        "-filter_threads", FILTER_THREADS,
+        "-i", background_path,
+        "-an",
+        "-vf", f"{BACKGROUND_SCALE},setsar=1",
+        "-c:v", "libx264", "-preset", "fast", "-crf", "20", "-threads", "0",
+        "-movflags", "+faststart",
+        part_path,
+    ]
+
+    print(f"[composer] Pre-scaling background {pexels_id} to {TARGET_WIDTH}x{TARGET_HEIGHT}...")
+    if DEBUG:
+        print(f"[composer] Command: {' '.join(cmd)}")
+
+    process_runner.run(cmd, tag="composer")
+    os.replace(part_path, cache_path)
+    return cache_path
 
-def compose_video(
+
+def compose_from_raw(
+    video_path: str | None = None,
     background_path: str | None = None,
-    overlay_path: str | None = None,
     audio_path: str | None = None,
     output_path: str | None = None,
+    crop: tuple[int, int, int, int] | None = None,
+    background_prescaled: bool = False,
+    threshold: float = DEFAULT_THRESHOLD,
+    tolerance: float = DEFAULT_TOLERANCE,
+    softness: float = DEFAULT_SOFTNESS,
 ) -> str:
     """
-    Compose the final video using FFmpeg.
+    Compose the final video from the raw downloads using a single FFmpeg run.
 
-    Steps:
-    1. Scale background to 1080x1920, crop/pad to fill exactly.
-    2. Scale transparent overlay to 1080x1920.
-    3. Overlay transparent video on top of background.
-    4. Mix in original audio, trim to shortest stream.
-    5. Encode as H.264 + AAC for maximum compatibility.
+    Steps (one filter_complex, no intermediate files):
+    1. Scale the source video to 1080x1920 and crop it to the content
+       bounding box (see background_remover.detect_overlay_crop).
+    2. Key out the black background of the foreground (lumakey → alpha).
+    3. Scale background to 1080x1920, crop to fill exactly (skipped when
+       it was already pre-scaled by prescale_background).
+    4. Overlay the foreground on top of the background at the crop offset.
+    5. Mix in original audio (stream-copied when it is already AAC), trim
+       to shortest stream.
+    6. Encode as H.264 + AAC for maximum compatibility, on NVENC/VAAPI
+       hardware when available (see select_encoder), otherwise libx264.
 
     Args:
+        video_path:      Path to source video. Defaults to tmp/source_video.mp4.
         background_path: Path to background video. Defaults to tmp/background.mp4.
-        overlay_path:    Path to transparent overlay. Defaults to tmp/transparent.mov.
         audio_path:      Path to audio file. Defaults to tmp/source_audio.m4a.
         output_path:     Output path. Defaults to tmp/final.mp4.
+        crop:            (width, height, x, y) of the foreground content on the
+                         1080x1920 canvas. None keys and blends the full frame.
+        background_prescaled: True if background_path is already 1080x1920.
+        threshold:       lumakey threshold (see background_remover).
+        tolerance:       lumakey tolerance (see background_remover).
+        softness:        lumakey softness (see background_remover).
 
     Returns:
         Absolute path to the composed final.mp4.
@@ -46,58 +281,116 @@ def compose_video(
     Raises:
         RuntimeError: If FFmpeg fails.
     """
-    if background_path is None:
-        background_path = os.path.join(TMP_DIR, "background.mp4")
-    if overlay_path is None:
-        overlay_path = os.path.join(TMP_DIR, "transparent.mov")
-    if audio_path is None:
-        audio_path = os.path.join(TMP_DIR, "source_audio.m4a")
-    if output_path is None:
-        output_path = os.path.join(TMP_DIR, "final.mp4")
-
-    if os.path.exists(output_path):
-        os.remove(output_path)
-
-    # FFmpeg filter_complex explanation:
-    # [0:v] → background: scale to 1080x1920 using cover-crop strategy
-    #         scale2ref ensures we fill the frame, then crop to exact size
-    # [1:v] → overlay (transparent.mov): scale to 1080x1920
-    # [bg][fg] → overlay fg on top of bg at position (0,0)
-    # [2:a] → original audio stream
-
-    filter_complex = (
-        f"[0:v]scale={TARGET_WIDTH}:{TARGET_HEIGHT}:force_original_aspect_ratio=increase,"
-        f"crop={TARGET_WIDTH}:{TARGET_HEIGHT},setsar=1[bg];"
-        f"[1:v]scale={TARGET_WIDTH}:{TARGET_HEIGHT},setsar=1[fg];"
-        f"[bg][fg]overlay=0:0[v]"
-    )
+    job = {
+        "video_path": video_path or os.path.join(TMP_DIR, "source_video.mp4"),
+        "background_path": background_path or os.path.join(TMP_DIR, "background.mp4"),
+        "audio_path": audio_path or os.path.join(TMP_DIR, "source_audio.m4a"),
+        "output_path": output_path or os.path.join(TMP_DIR, "final.mp4"),
+        "crop": crop,
+        "background_prescaled": background_prescaled,
+    }
+    return compose_batch([job], threshold, tolerance, softness)[0]
+
+
+def compose_batch(
+    jobs: list[dict],
+    threshold: float = DEFAULT_THRESHOLD,
+    tolerance: float = DEFAULT_TOLERANCE,
+    softness: float = DEFAULT_SOFTNESS,
+) -> list[str]:
+    """
+    Compose several final videos with one FFmpeg process (one output per job).
+
+    FFmpeg start-up, encoder probing and the x264 thread pools are paid once
+    for the whole batch. Each job gets its own chain in the filter_complex,
+    built exactly as described in compose_from_raw.
+
+    Args:
+        jobs: List of dicts with keys video_path, background_path, audio_path,
+              output_path and optionally crop, background_prescaled (see
+              compose_from_raw for their meaning).
+        threshold: lumakey threshold (see background_remover).
+        tolerance: lumakey tolerance (see background_remover).
+        softness:  lumakey softness (see background_remover).
+
+    Returns:
+        List of output paths, in the same order as jobs.
+
+    Raises:
+        RuntimeError: If FFmpeg fails.
+    """
+    encoder = select_encoder()
+    input_args, filter_tail, encoder_args = _encoder_args(encoder)
+    print(f"[composer] Using H.264 encoder: {encoder}")
+
+    lumakey = build_lumakey_filter(threshold, tolerance, softness)
 
     cmd = [
-        "ffmpeg",
+        FFMPEG,
         "-y",
-        "-i", background_path,      # Input 0: background
-        "-i", overlay_path,          # Input 1: transparent overlay
-        "-i", audio_path,            # Input 2: audio
-        "-filter_complex", filter_complex,
-        "-map", "[v]",               # Use composed video
-        "-map", "2:a",               # Use original audio
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "23",                # Good quality / size balance
-        "-c:a", "aac",
-        "-b:a", "192k",
-        "-shortest",                 # Trim to shortest stream (audio = Quran clip)
-        "-movflags", "+faststart",   # Web-optimized MP4
-        output_path,
+        "-loglevel", "error",
+        "-filter_complex_threads", FILTER_THREADS,
+        *input_args,
     ]
+    filters = []
+    output_args = []
+
+    # FFmpeg filter_complex explanation (per job i, inputs n=3i, 3i+1, 3i+2):
+    # [n:v]   → source video: scaled to 1080x1920, cropped to the content
+    #           bounding box, then lumakey turns the black background transparent
+    #           (keying/blending only the cropped region skips transparent pixels)
+    # [n+1:v] → background: scale to 1080x1920 using cover-crop strategy
+    #           (increase aspect ratio to fill the frame, then crop to exact size)
+    # [bg][fg] → overlay fg on top of bg at the crop position
+    # [n+2:a] → original audio stream
+    for i, job in enumerate(jobs):
+        if os.path.exists(job["output_path"]):
+            os.remove(job["output_path"])
+
+        n = 3 * i
+        cmd += [
+            "-i", job["video_path"],        # Input n:   source video (keyed in-graph)
+            "-i", job["background_path"],   # Input n+1: background
+            "-i", job["audio_path"],        # Input n+2: audio
+        ]
+
+        fg = f"scale={TARGET_WIDTH}:{TARGET_HEIGHT},setsar=1"
+        x, y = 0, 0
+        if job.get("crop"):
+            w, h, x, y = job["crop"]
+            fg += f",crop={w}:{h}:{x}:{y}"
+        overlay = f"overlay={x}:{y}:format=auto"
+        if filter_tail:
+            overlay += f",{filter_tail}"
+        if job.get("background_prescaled"):
+            bg = "setsar=1"
+        else:
+            bg = f"{BACKGROUND_SCALE},setsar=1"
+        filters.append(
+            f"[{n}:v]{fg},{lumakey}[fg{i}];"
+            f"[{n + 1}:v]{bg}[bg{i}];"
+            f"[bg{i}][fg{i}]{overlay}[v{i}]"
+        )
+
+        output_args += [
+            "-map", f"[v{i}]",              # Use composed video
+            "-map", f"{n + 2}:a",           # Use original audio
+            *encoder_args,                  # CQ/CRF 23: good quality / size balance
+            *_audio_args(job["audio_path"]),
+            "-shortest",                    # Trim to shortest stream (audio = Quran clip)
+            "-movflags", "+faststart",      # Web-optimized MP4
+            job["output_path"],
+        ]
+
+    cmd += ["-filter_complex", ";".join(filters), *output_args]
 
-    print(f"[composer] Running FFmpeg composition...")
-    print(f"[composer] Command: {' '.join(cmd)}")
+    print(f"[composer] Running fused FFmpeg lumakey + composition ({len(jobs)} video(s))...")
+    if DEBUG:
+        print(f"[composer] Command: {' '.join(cmd)}")
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"[composer] FFmpeg failed:\n{result.stderr}")
+    process_runner.run(cmd, tag="composer")
 
-    size_mb = os.path.getsize(output_path) / (1024 * 1024)
-    print(f"[composer] Final video saved: {output_path} ({size_mb:.1f} MB)")
-    return output_path
+    for job in jobs:
+        size_mb = os.path.getsize(job["output_path"]) / (1024 * 1024)
+        print(f"[composer] Final video saved: {job['output_path']} ({size_mb:.1f} MB)")
+    return [job["output_path"] for job in jobs]
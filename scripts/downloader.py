@@ -1,6 +1,8 @@
 """
 downloader.py – Downloads a YouTube video's video and audio streams separately
-using yt-dlp, storing them in the tmp/ directory.
+using the in-process yt-dlp API, storing them in the tmp/ directory.
+
+The video page is extracted once; both stream downloads reuse that result.
 
 Bot Detection Fix:
   YouTube blocks yt-dlp on server environments (GitHub Actions).
@@ -9,9 +11,14 @@ Bot Detection Fix:
   The downloader will write them to a temp file and pass them to yt-dlp.
 """
 
+import copy
 import os
-import subprocess
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import YoutubeDLError
 
 TMP_DIR = os.path.join(os.path.dirname(__file__), "..", "tmp")
 COOKIES_ENV = "YOUTUBE_COOKIES"  # GitHub Secret name
@@ -36,12 +43,14 @@ def _get_cookies_file() -> str | None:
     return cookies_path
 
 
-def download_video_and_audio(video_id: str) -> tuple[str, str]:
+def download_video_and_audio(video_id: str, output_dir: str | None = None) -> tuple[str, str]:
     """
     Download video-only and audio-only streams for a YouTube video.
 
     Args:
-        video_id: YouTube video ID (e.g. "dQw4w9WgXcQ")
+        video_id:   YouTube video ID (e.g. "dQw4w9WgXcQ")
+        output_dir: Directory for source_video.mp4 / source_audio.m4a.
+                    Defaults to tmp/.
 
     Returns:
         Tuple of (video_path, audio_path) as absolute strings.
@@ -50,9 +59,12 @@ def download_video_and_audio(video_id: str) -> tuple[str, str]:
         RuntimeError: If yt-dlp fails.
     """
     _ensure_tmp()
+    if output_dir is None:
+        output_dir = TMP_DIR
+    os.makedirs(output_dir, exist_ok=True)
     url = f"https://www.youtube.com/watch?v={video_id}"
-    video_path = os.path.join(TMP_DIR, "source_video.mp4")
-    audio_path = os.path.join(TMP_DIR, "source_audio.m4a")
+    video_path = os.path.join(output_dir, "source_video.mp4")
+    audio_path = os.path.join(output_dir, "source_audio.m4a")
 
     # Remove stale files
     for path in [video_path, audio_path]:
@@ -65,46 +77,80 @@ def download_video_and_audio(video_id: str) -> tuple[str, str]:
     else:
         print(f"[downloader] ⚠️  No YOUTUBE_COOKIES found. May fail on CI environments.")
 
-    print(f"[downloader] Downloading video stream for {video_id}...")
-    _run_ytdlp(
-        url,
-        format_selector="bestvideo[ext=mp4][height<=1080]",
-        output_path=video_path,
-        cookies_file=cookies_file,
-    )
-
-    print(f"[downloader] Downloading audio stream for {video_id}...")
-    _run_ytdlp(
-        url,
-        format_selector="bestaudio[ext=m4a]/bestaudio",
-        output_path=audio_path,
-        cookies_file=cookies_file,
-    )
+    # Resolve the video page once; both downloads reuse the extracted info
+    print(f"[downloader] Extracting stream info for {video_id}...")
+    try:
+        with YoutubeDL(_ytdlp_options(cookies_file)) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+    except YoutubeDLError as e:
+        raise RuntimeError(f"[downloader] yt-dlp failed:\n{e}") from e
+
+    # The two streams are independent downloads, so fetch them concurrently.
+    # YoutubeDL instances are not thread-safe, so each thread gets its own.
+    print(f"[downloader] Downloading video and audio streams for {video_id}...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(
+                _download_format,
+                info,
+                format_selector="bestvideo[ext=mp4][height<=1080]",
+                output_path=video_path,
+                cookies_file=cookies_file,
+            ),
+            executor.submit(
+                _download_format,
+                info,
+                format_selector="bestaudio[ext=m4a]/bestaudio",
+                output_path=audio_path,
+                cookies_file=cookies_file,
+            ),
+        ]
+        for future in as_completed(futures):
+            future.result()  # Re-raise the first yt-dlp failure
 
     print(f"[downloader] Done. Video: {video_path}, Audio: {audio_path}")
     return video_path, audio_path
 
 
-def _run_ytdlp(url: str, format_selector: str, output_path: str, cookies_file: str | None = None) -> None:
-    """Run yt-dlp as a subprocess, optionally with a cookies file."""
-    cmd = [
-        "yt-dlp",
-        "--no-playlist",
-        "--no-warnings",
-        "--extractor-retries", "3",
-        "--sleep-interval", "2",       # Be polite to YouTube
-        "--max-sleep-interval", "5",
-        "-f", format_selector,
-        "-o", output_path,
-    ]
+def _ytdlp_options(cookies_file: str | None = None) -> dict:
+    """Build the YoutubeDL options shared by extraction and both downloads."""
+    opts = {
+        "noplaylist": True,
+        "quiet": True,
+        "no_warnings": True,
+        "extractor_retries": 3,
+        "retries": 3,
+        "sleep_interval": 2,                 # Be polite to YouTube
+        "max_sleep_interval": 5,
+        "concurrent_fragment_downloads": 8,  # Parallel DASH/HLS fragment downloads
+    }
 
     if cookies_file:
-        cmd += ["--cookies", cookies_file]
-
-    cmd.append(url)
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"[downloader] yt-dlp failed:\n{result.stderr}"
-        )
+        opts["cookiefile"] = cookies_file
+
+    # aria2c opens multiple connections per file, sidestepping YouTube's
+    # per-connection throttling
+    if shutil.which("aria2c"):
+        opts["external_downloader"] = {"default": "aria2c"}
+        opts["external_downloader_args"] = {"aria2c": ["-x16", "-s16"]}
+
+    return opts
+
+
+def _download_format(
+    info: dict,
+    format_selector: str,
+    output_path: str,
+    cookies_file: str | None = None,
+) -> None:
+    """Download one format of an already-extracted video with yt-dlp."""
+    opts = _ytdlp_options(cookies_file)
+    opts["format"] = format_selector
+    opts["outtmpl"] = output_path
+
+    try:
+        with YoutubeDL(opts) as ydl:
+            # Each thread processes its own copy: yt-dlp mutates the info dict
+            ydl.process_ie_result(copy.deepcopy(info), download=True)
+    except YoutubeDLError as e:
+        raise RuntimeError(f"[downloader] yt-dlp failed:\n{e}") from e
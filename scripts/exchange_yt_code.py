@@ -1,5 +1,5 @@
 import os
-import requests
+from http_session import create_session
 import json
 
 # User provided credentials
@@ -8,6 +8,8 @@ CLIENT_SECRET = "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"
 AUTH_CODE = "4/0AfrIepAk1PUg64gJjASGftmBoJxeqSibaA8WWYfAV0IgLBkruzhj6GLuBtJYPaBdPhZS-w"
 REDIRECT_URI = "http://localhost:8080" # This must match what was in the link
 
+_SESSION = create_session()
+
 def exchange_code():
     url = "https://oauth2.googleapis.com/token"
     payload = {
@@ -18,7 +20,7 @@ def exchange_code():
         "grant_type": "authorization_code",
     }
     
-    response = requests.post(url, data=payload)
+    response = _SESSION.post(url, data=payload, timeout=10)
     if response.status_code == 200:
         data = response.json()
         print(f"SUCCESS_REFRESH_TOKEN: {data['refresh_token']}")
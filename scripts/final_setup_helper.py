@@ -1,5 +1,5 @@
 import os
-import requests
+from http_session import create_session
 import hashlib
 import base64
 import secrets
@@ -13,6 +13,8 @@ REDIRECT_URI = "http://localhost:8080"
 # TikTok Credentials
 TT_CLIENT_KEY = "awol3vl3mst4jc0o"
 
+_SESSION = create_session()
+
 def get_yt_refresh_token():
     print("\n--- [1/2] YouTube: Exchanging Code for Refresh Token ---")
     url = "https://oauth2.googleapis.com/token"
@@ -23,7 +25,7 @@ def get_yt_refresh_token():
         "redirect_uri": REDIRECT_URI,
         "grant_type": "authorization_code",
     }
-    resp = requests.post(url, data=payload)
+    resp = _SESSION.post(url, data=payload, timeout=10)
     if resp.status_code == 200:
         token = resp.json().get("refresh_token")
         print(f"✅ YouTube Refresh Token: {token}")
@@ -0,0 +1,61 @@
+"""
+http_session.py – Builds pooled requests.Session objects with retries.
+
+A session keeps TCP/TLS connections alive between calls to the same host, so
+only the first request pays for the handshake. Idempotent requests are
+retried with exponential backoff on connection errors and 429/5xx responses.
+
+JSON bodies are decoded with orjson when it is installed (falls back to the
+stdlib decoder used by Response.json()).
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_connections: int = 4, pool_maxsize: int = 4) -> requests.Session:
+    """
+    Create a requests.Session with a pooled, retrying HTTPAdapter.
+
+    Args:
+        pool_connections: Number of per-host connection pools to cache.
+        pool_maxsize:     Maximum connections kept alive per host.
+
+    Returns:
+        A configured requests.Session.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUS_CODES,
+        raise_on_status=False,  # Hand the last response back to the caller
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def json_body(response: requests.Response):
+    """
+    Decode a response body as JSON, using orjson when available.
+
+    Raises:
+        ValueError: If the body is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
@@ -3,19 +3,43 @@ license_validator.py – Secondary validation layer to confirm a YouTube video
 is truly Creative Commons, not live, and not age-restricted.
 """
 
-import os
-from googleapiclient.discovery import build
-
-YOUTUBE_API_KEY = os.environ["YOUTUBE_API_KEY"]
-
-
-def _build_client():
-    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+from youtube_client import get_api_client
+
+# videos.list accepts at most 50 comma-separated IDs per request
+MAX_IDS_PER_REQUEST = 50
+
+# Partial response: only the fields _check_item reads
+VALIDATION_FIELDS = (
+    "items(id,snippet/liveBroadcastContent,"
+    "contentDetails(licensedContent,contentRating/ytRating),"
+    "status(embeddable,privacyStatus))"
+)
+
+
+def _fetch_items(video_ids: list[str]) -> dict:
+    """Fetch videos.list items for the given IDs, batched 50 per request."""
+    youtube = get_api_client()
+    items = {}
+    for start in range(0, len(video_ids), MAX_IDS_PER_REQUEST):
+        batch = video_ids[start:start + MAX_IDS_PER_REQUEST]
+        response = (
+            youtube.videos()
+            .list(
+                id=",".join(batch),
+                part="contentDetails,status,snippet",
+                maxResults=MAX_IDS_PER_REQUEST,
+                fields=VALIDATION_FIELDS,
+            )
+            .execute()
+        )
+        for item in response.get("items", []):
+            items[item["id"]] = item
+    return items
 
 
-def validate_video(video_id: str) -> bool:
+def _check_item(video_id: str, item: dict | None) -> bool:
     """
-    Perform a strict license and content check on a single YouTube video.
+    Run the license and content checks on a videos.list item.
 
     Checks:
     - License must be 'creativeCommon'
@@ -26,23 +50,10 @@ def validate_video(video_id: str) -> bool:
     Returns:
         True if the video passes all checks, False otherwise.
     """
-    youtube = _build_client()
-
-    response = (
-        youtube.videos()
-        .list(
-            id=video_id,
-            part="contentDetails,status,snippet",
-        )
-        .execute()
-    )
-
-    items = response.get("items", [])
-    if not items:
+    if not item:
         print(f"[license_validator] Video {video_id} not found.")
         return False
 
-    item = items[0]
     content_details = item.get("contentDetails", {})
     status = item.get("status", {})
     snippet = item.get("snippet", {})
@@ -78,14 +89,30 @@ def validate_video(video_id: str) -> bool:
     return True
 
 
+def validate_video(video_id: str) -> bool:
+    """
+    Perform a strict license and content check on a single YouTube video.
+
+    Returns:
+        True if the video passes all checks, False otherwise.
+    """
+    return _check_item(video_id, _fetch_items([video_id]).get(video_id))
+
+
 def filter_valid_videos(videos: list[dict]) -> list[dict]:
     """
     Filter a list of video metadata dicts, keeping only those that pass validation.
 
+    All videos are looked up with a single batched videos.list call instead of
+    one request per video.
+
     Args:
         videos: List of dicts from youtube_fetcher.fetch_quran_videos()
 
     Returns:
         Filtered list of valid video dicts.
     """
-    return [v for v in videos if validate_video(v["videoId"])]
+    if not videos:
+        return []
+    items = _fetch_items([v["videoId"] for v in videos])
+    return [v for v in videos if _check_item(v["videoId"], items.get(v["videoId"]))]
@@ -1,13 +1,26 @@
 """
 logger.py – Manages the used_videos.json database.
 Tracks processed YouTube video IDs and Pexels background performance scores.
+
+The database is read from disk once per process and kept in memory; the
+used video IDs are mirrored in a set for O(1) lookups. Changes are written
+back once by flush() (also registered with atexit), and only if something
+actually changed.
 """
 
+import atexit
 import json
 import os
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "database", "used_videos.json")
 
+# Pretty-print the DB only when debugging; compact JSON halves size and parse cost
+DEBUG = bool(os.environ.get("DEBUG"))
+
+_DB: dict | None = None
+_USED_IDS: set[str] = set()
+_dirty = False
+
 
 def load_db() -> dict:
     """Load the database from disk. Returns default structure if missing."""
@@ -18,24 +31,54 @@ def load_db() -> dict:
 
 
 def save_db(data: dict) -> None:
-    """Persist the database to disk."""
+    """Persist the database to disk atomically (write temp file, then rename)."""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    with open(DB_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    tmp_path = DB_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if DEBUG:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        else:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp_path, DB_PATH)
+
+
+def flush() -> None:
+    """Write pending in-memory changes to disk. No-op if nothing changed."""
+    global _dirty
+    if _DB is None or not _dirty:
+        return
+    save_db(_DB)
+    _dirty = False
+
+
+atexit.register(flush)
+
+
+def _db() -> dict:
+    """Return the in-memory database, loading it from disk on first use."""
+    global _DB, _USED_IDS
+    if _DB is None:
+        _DB = load_db()
+        _DB.setdefault("used_video_ids", [])
+        _DB.setdefault("background_performance", {})
+        _USED_IDS = set(_DB["used_video_ids"])
+    return _DB
 
 
 def is_used(video_id: str) -> bool:
     """Return True if this YouTube video ID has already been processed."""
-    db = load_db()
-    return video_id in db.get("used_video_ids", [])
+    _db()
+    return video_id in _USED_IDS
 
 
 def mark_used(video_id: str) -> None:
     """Add a YouTube video ID to the used list."""
-    db = load_db()
-    if video_id not in db["used_video_ids"]:
+    global _dirty
+    db = _db()
+    if video_id not in _USED_IDS:
+        _USED_IDS.add(video_id)
         db["used_video_ids"].append(video_id)
-    save_db(db)
+        _dirty = True
 
 
 def record_background(pexels_id: str, engagement_boost: float = 1.0) -> None:
@@ -47,14 +90,14 @@ def record_background(pexels_id: str, engagement_boost: float = 1.0) -> None:
         engagement_boost: A positive float to add to the score (default 1.0 per use).
                           Callers can pass higher values when actual view counts are known.
     """
-    db = load_db()
-    perf = db.setdefault("background_performance", {})
+    global _dirty
+    db = _db()
+    perf = db["background_performance"]
     current = perf.get(str(pexels_id), 0.0)
     perf[str(pexels_id)] = round(current + engagement_boost, 4)
-    save_db(db)
+    _dirty = True
 
 
 def get_background_scores() -> dict:
     """Return the full background_performance mapping {pexels_id: score}."""
-    db = load_db()
-    return db.get("background_performance", {})
+    return _db()["background_performance"]
@@ -3,20 +3,21 @@ main.py – Orchestrator for the Quran Shorts automation pipeline.
 
 Execution order:
   1. Load DB → fetch YouTube videos → validate licenses
-  2. Pick first unused, valid video
-  3. Download video + audio streams
-  4. Remove black background (FFmpeg lumakey)
-  5. Select intelligent Pexels background
-  6. Compose final 1080x1920 video
-  7. Generate metadata
-  8. Upload to YouTube, Instagram, TikTok (unless DRY_RUN=true)
-  9. Update DB (mark video used, record background)
-  10. Clean up tmp/
+  2. Pick the first BATCH_SIZE unused, valid videos (default 1)
+  3. Download video + audio streams        (concurrently with 4)
+  4. Select intelligent Pexels backgrounds (concurrently with 3)
+  5. Remove black background + compose final 1080x1920 videos
+     (single FFmpeg process for the whole batch: lumakey → overlay → encode)
+  6. Generate metadata
+  7. Upload to YouTube, Instagram, TikTok (unless DRY_RUN=true)
+  8. Update DB (mark videos used, record backgrounds)
+  9. Clean up tmp/
 """
 
 import os
 import sys
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 # Add scripts/ to path so relative imports work
 sys.path.insert(0, os.path.dirname(__file__))
@@ -33,20 +34,47 @@ import uploader
 
 TMP_DIR = os.path.join(os.path.dirname(__file__), "..", "tmp")
 DRY_RUN = os.environ.get("DRY_RUN", "false").lower() == "true"
+# Number of videos processed per run; start-up costs are paid once per batch
+BATCH_SIZE = max(1, int(os.environ.get("BATCH_SIZE", "1")))
 
 
 def cleanup_tmp():
-    """Remove all files in the tmp/ directory."""
-    if os.path.exists(TMP_DIR):
-        shutil.rmtree(TMP_DIR)
+    """Remove all files in the tmp/ directory, keeping the tmp/cache/ directory."""
     os.makedirs(TMP_DIR, exist_ok=True)
+    for name in os.listdir(TMP_DIR):
+        if name == "cache":
+            continue
+        path = os.path.join(TMP_DIR, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
     print("[main] tmp/ directory cleaned.")
 
 
+def _prepare_backgrounds(output_paths: list[str]) -> list[tuple[str, str]]:
+    """
+    Select, download and pre-scale one Pexels background per output path.
+
+    Runs sequentially so a background picked twice in a batch is pre-scaled
+    once and then served from the cache. Backgrounds already in the cache
+    are not downloaded at all.
+    """
+    scores = logger.get_background_scores()
+    results = []
+    for output_path in output_paths:
+        pexels_id, bg_path = pexels_fetcher.select_and_download_background(
+            output_path, scores, cached_path=composer.cached_background
+        )
+        results.append((pexels_id, composer.prescale_background(bg_path, pexels_id)))
+    return results
+
+
 def main():
     print("=" * 60)
     print("🕌  Quran Shorts Automation Pipeline")
     print(f"    DRY_RUN = {DRY_RUN}")
+    print(f"    BATCH_SIZE = {BATCH_SIZE}")
     print("=" * 60)
 
     # ── Step 1: Fetch and validate videos ─────────────────────────
@@ -71,90 +99,84 @@ def main():
         print("[main] No valid CC videos found after license check. Exiting.")
         sys.exit(0)
 
-    # Pick the first valid video
-    video = valid_videos[0]
-    video_id = video["videoId"]
-    print(f"\n[main] Selected video: '{video['title']}' by {video['channelTitle']} ({video_id})")
+    # Pick the first BATCH_SIZE valid videos; each gets its own tmp/<videoId>/
+    batch = valid_videos[:BATCH_SIZE]
+    work_dirs = [os.path.join(TMP_DIR, v["videoId"]) for v in batch]
+    for video in batch:
+        print(f"\n[main] Selected video: '{video['title']}' by {video['channelTitle']} ({video['videoId']})")
 
-    # ── Step 4: Download ───────────────────────────────────────────
+    # ── Steps 4–5: Download + select Pexels backgrounds (parallel) ─
+    # Both are network-bound and independent. The overlay cropdetect pass
+    # only needs the source video, so it runs while the backgrounds are still
+    # downloading / being pre-scaled.
     print("\n[main] Step 4: Downloading video and audio...")
-    os.makedirs(TMP_DIR, exist_ok=True)
-    video_path, audio_path = downloader.download_video_and_audio(video_id)
-
-    # ── Step 5: Remove background ──────────────────────────────────
-    print("\n[main] Step 5: Removing black background (FFmpeg lumakey)...")
-    overlay_path = background_remover.remove_background(
-        input_path=video_path,
-        output_path=os.path.join(TMP_DIR, "transparent.mov"),
-    )
-
-    # ── Step 6: Select Pexels background ──────────────────────────
-    print("\n[main] Step 6: Selecting intelligent Pexels background...")
-    pexels_id, bg_path = pexels_fetcher.select_and_download_background()
-
-    # ── Step 7: Compose final video ────────────────────────────────
-    print("\n[main] Step 7: Composing final 1080x1920 video...")
-    final_path = composer.compose_video(
-        background_path=bg_path,
-        overlay_path=overlay_path,
-        audio_path=audio_path,
-        output_path=os.path.join(TMP_DIR, "final.mp4"),
-    )
-
-    # ── Step 8: Generate metadata ──────────────────────────────────
-    print("\n[main] Step 8: Generating metadata...")
-    meta = metadata_generator.generate_metadata(
-        original_title=video["title"],
-        channel_title=video["channelTitle"],
-        video_id=video_id,
-    )
-    print(f"[main] Title: {meta['title']}")
-
-    # ── Step 9: Upload ─────────────────────────────────────────────
-    if DRY_RUN:
-        print("\n[main] ⚠️  DRY RUN MODE – Skipping uploads.")
-        print(f"[main] Would upload: {final_path}")
-        print(f"[main] Metadata:\n  Title: {meta['title']}\n  Tags: {meta['tags'][:5]}...")
-    else:
-        print("\n[main] Step 9: Uploading to all platforms...")
-
-        # YouTube Upload Check
-        if all([os.environ.get("YOUTUBE_CLIENT_ID"), os.environ.get("YOUTUBE_CLIENT_SECRET"), os.environ.get("YOUTUBE_REFRESH_TOKEN")]):
-            try:
-                uploader.upload_youtube(final_path, meta)
-            except Exception as e:
-                print(f"[main] ⚠️  YouTube upload failed: {e}")
+    print("[main] Step 5: Selecting intelligent Pexels background (in parallel)...")
+    for work_dir in work_dirs:
+        os.makedirs(work_dir, exist_ok=True)
+    jobs = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        bg_future = executor.submit(
+            _prepare_backgrounds,
+            [os.path.join(work_dir, "background.mp4") for work_dir in work_dirs],
+        )
+        for video, work_dir in zip(batch, work_dirs):
+            video_path, audio_path = downloader.download_video_and_audio(video["videoId"], work_dir)
+            jobs.append(
+                {
+                    "video_path": video_path,
+                    "audio_path": audio_path,
+                    "output_path": os.path.join(work_dir, "final.mp4"),
+                    "crop": background_remover.detect_overlay_crop(video["videoId"], video_path),
+                    "background_prescaled": True,
+                }
+            )
+        backgrounds = bg_future.result()
+
+    for job, (pexels_id, bg_path) in zip(jobs, backgrounds):
+        job["pexels_id"] = pexels_id
+        job["background_path"] = bg_path
+
+    # ── Step 6: Remove background + compose final videos ──────────
+    print("\n[main] Step 6: Removing black background and composing final 1080x1920 video(s)...")
+    final_paths = composer.compose_batch(jobs)
+    # Trim the background cache only now, so no background of this batch is
+    # evicted before compose_batch has read it
+    composer.prune_bg_cache(keep={job["background_path"] for job in jobs})
+
+    for video, job, final_path in zip(batch, jobs, final_paths):
+        video_id = video["videoId"]
+        pexels_id = job["pexels_id"]
+
+        # ── Step 7: Generate metadata ──────────────────────────────
+        print(f"\n[main] Step 7: Generating metadata for {video_id}...")
+        meta = metadata_generator.generate_metadata(
+            original_title=video["title"],
+            channel_title=video["channelTitle"],
+            video_id=video_id,
+        )
+        print(f"[main] Title: {meta['title']}")
+
+        # ── Step 8: Upload ─────────────────────────────────────────
+        if DRY_RUN:
+            print("\n[main] ⚠️  DRY RUN MODE – Skipping uploads.")
+            print(f"[main] Would upload: {final_path}")
+            print(f"[main] Metadata:\n  Title: {meta['title']}\n  Tags: {meta['tags'][:5]}...")
         else:
-            print("[main] ⏩ Skipping YouTube: Credentials missing.")
-
-        # Instagram Upload Check
-        if all([os.environ.get("INSTAGRAM_ACCESS_TOKEN"), os.environ.get("INSTAGRAM_ACCOUNT_ID")]):
-            try:
-                uploader.upload_instagram(final_path, meta)
-            except Exception as e:
-                print(f"[main] ⚠️  Instagram upload failed: {e}")
-        else:
-            print("[main] ⏩ Skipping Instagram: Credentials missing.")
-
-        # TikTok Upload Check
-        if os.environ.get("TIKTOK_ACCESS_TOKEN"):
-            try:
-                uploader.upload_tiktok(final_path, meta)
-            except Exception as e:
-                print(f"[main] ⚠️  TikTok upload failed: {e}")
-        else:
-            print("[main] ⏩ Skipping TikTok: Credentials missing.")
-
-    # ── Step 10: Update database ───────────────────────────────────
-    print("\n[main] Step 10: Updating database...")
-    logger.mark_used(video_id)
-    # Record background with a base engagement score of 1.0 per use
-    logger.record_background(pexels_id, engagement_boost=1.0)
-    print(f"[main] Marked video {video_id} as used.")
-    print(f"[main] Recorded background {pexels_id} in performance DB.")
-
-    # ── Step 11: Cleanup ───────────────────────────────────────────
-    print("\n[main] Step 11: Cleaning up tmp/...")
+            print("\n[main] Step 8: Uploading to all platforms...")
+            uploader.upload_all(final_path, meta)
+
+        # ── Step 9: Update database ───────────────────────────────
+        print("\n[main] Step 9: Updating database...")
+        logger.mark_used(video_id)
+        # Record background with a base engagement score of 1.0 per use
+        logger.record_background(pexels_id, engagement_boost=1.0)
+        print(f"[main] Marked video {video_id} as used.")
+        print(f"[main] Recorded background {pexels_id} in performance DB.")
+
+    logger.flush()
+
+    # ── Step 10: Cleanup ───────────────────────────────────────────
+    print("\n[main] Step 10: Cleaning up tmp/...")
     cleanup_tmp()
 
     print("\n" + "=" * 60)
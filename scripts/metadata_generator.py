@@ -3,6 +3,48 @@ metadata_generator.py – Generates title, description, and hashtags for the
 Quran Short video, including proper attribution to the original creator.
 """
 
+# Static parts of the metadata, built once at import
+_DESCRIPTION_TEMPLATE = """\
+{clean_title}
+
+🌙 A beautiful Quran recitation short to bring peace to your heart.
+
+📖 Original recitation by: {channel_title}
+🔗 Original video: {original_url}
+
+This video is shared under the Creative Commons license (CC BY).
+All credit goes to the original creator.
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+🤲 Subscribe for daily Quran recitations
+🔔 Turn on notifications to never miss a short
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+#Quran #QuranRecitation #IslamicShorts #QuranShorts #Alhamdulillah \
+#Islam #QuranKareem #MuslimShorts #QuranDaily #Subhanallah \
+#IslamicContent #QuranVerses #Deen #Iman #Salah
+"""
+
+_BASE_TAGS = (
+    "Quran",
+    "Quran Recitation",
+    "Islamic Shorts",
+    "Quran Shorts",
+    "Alhamdulillah",
+    "Islam",
+    "Quran Kareem",
+    "Muslim Shorts",
+    "Quran Daily",
+    "Subhanallah",
+    "Islamic Content",
+    "Quran Verses",
+    "Deen",
+    "Iman",
+    "Salah",
+)
+
+_HASHTAGS = "#Quran #QuranRecitation #IslamicShorts #QuranShorts #Alhamdulillah"
+
 
 def generate_metadata(
     original_title: str,
@@ -27,53 +69,17 @@ def generate_metadata(
 
     title = f"🕌 {clean_title} | Quran Recitation Short"
 
-    original_url = f"https://www.youtube.com/watch?v={video_id}"
-
-    description = f"""\
-{clean_title}
-
-🌙 A beautiful Quran recitation short to bring peace to your heart.
-
-📖 Original recitation by: {channel_title}
-🔗 Original video: {original_url}
-
-This video is shared under the Creative Commons license (CC BY).
-All credit goes to the original creator.
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-🤲 Subscribe for daily Quran recitations
-🔔 Turn on notifications to never miss a short
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-#Quran #QuranRecitation #IslamicShorts #QuranShorts #Alhamdulillah \
-#Islam #QuranKareem #MuslimShorts #QuranDaily #Subhanallah \
-#IslamicContent #QuranVerses #Deen #Iman #Salah
-"""
-
-    tags = [
-        "Quran",
-        "Quran Recitation",
-        "Islamic Shorts",
-        "Quran Shorts",
-        "Alhamdulillah",
-        "Islam",
-        "Quran Kareem",
-        "Muslim Shorts",
-        "Quran Daily",
-        "Subhanallah",
-        "Islamic Content",
-        "Quran Verses",
-        "Deen",
-        "Iman",
-        "Salah",
-        channel_title,
-    ]
+    description = _DESCRIPTION_TEMPLATE.format(
+        clean_title=clean_title,
+        channel_title=channel_title,
+        original_url=f"https://www.youtube.com/watch?v={video_id}",
+    )
 
     return {
         "title": title,
         "description": description.strip(),
-        "tags": tags,
+        "tags": [*_BASE_TAGS, channel_title],
         "category_id": "29",        # Nonprofits & Activism
         "default_language": "ar",
-        "hashtags": "#Quran #QuranRecitation #IslamicShorts #QuranShorts #Alhamdulillah",
+        "hashtags": _HASHTAGS,
     }
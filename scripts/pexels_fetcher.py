@@ -2,12 +2,26 @@
 pexels_fetcher.py – Intelligently selects and downloads a spiritual/calm
 background video from Pexels, prioritizing backgrounds that have performed
 well in previous Quran Shorts (based on engagement scores in the DB).
+
+Pexels API responses are cached on disk (tmp/cache/, persisted between
+workflow runs) for PEXELS_CACHE_TTL seconds. Expired entries that carry an
+ETag are revalidated with If-None-Match, so an unchanged resource costs a
+bodiless 304 instead of a full JSON payload.
 """
 
+import heapq
+import json
 import os
 import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import urlencode
+
 import requests
 
+from http_session import create_session, json_body
 from logger import get_background_scores
 
 PEXELS_API_KEY = os.environ["PEXELS_API_KEY"]
@@ -15,6 +29,18 @@ PEXELS_VIDEO_SEARCH_URL = "https://api.pexels.com/videos/search"
 
 TMP_DIR = os.path.join(os.path.dirname(__file__), "..", "tmp")
 
+# Pooled keep-alive session: API calls and the video download reuse connections
+SESSION = create_session(pool_connections=10, pool_maxsize=20)
+
+# Search results and video details change slowly; the pipeline runs every 6 h,
+# so a one-day TTL lets most runs answer from the cache.
+PEXELS_CACHE_PATH = os.path.join(TMP_DIR, "cache", "pexels_api.json")
+PEXELS_CACHE_TTL = 24 * 3600
+# Expired entries are kept this long so their ETag can still be revalidated
+PEXELS_CACHE_MAX_AGE = 7 * 24 * 3600
+
+_api_cache: dict | None = None
+
 # Spiritual / visually calm search keywords for backgrounds
 SPIRITUAL_KEYWORDS = [
     "mosque",
@@ -36,19 +62,81 @@ HIGH_SCORE_THRESHOLD = 2.0
 MIN_WIDTH = 1080
 MIN_HEIGHT = 1920
 
+# Background downloads are split into this many parallel HTTP Range requests;
+# files smaller than DOWNLOAD_MIN_PARALLEL_SIZE are fetched in one stream.
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_MIN_PARALLEL_SIZE = 4 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _load_api_cache() -> dict:
+    """Return the on-disk API cache {url: {fetched_at, etag, data}}, loading it once."""
+    global _api_cache
+    if _api_cache is None:
+        _api_cache = {}
+        if os.path.exists(PEXELS_CACHE_PATH):
+            with open(PEXELS_CACHE_PATH, "r", encoding="utf-8") as f:
+                _api_cache = json.load(f)
+    return _api_cache
+
+
+def _save_api_cache(cache: dict) -> None:
+    """Persist the API cache, dropping entries older than PEXELS_CACHE_MAX_AGE."""
+    now = time.time()
+    fresh = {k: v for k, v in cache.items() if now - v["fetched_at"] < PEXELS_CACHE_MAX_AGE}
+    os.makedirs(os.path.dirname(PEXELS_CACHE_PATH), exist_ok=True)
+    tmp_path = PEXELS_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(fresh, f, separators=(",", ":"))
+    os.replace(tmp_path, PEXELS_CACHE_PATH)
+
+
+def _get_json(url: str, params: dict | None = None) -> dict:
+    """
+    GET a Pexels API URL and return its JSON, served from the disk cache
+    while the cached copy is younger than PEXELS_CACHE_TTL. An older copy with
+    an ETag is revalidated with a conditional GET and reused on 304.
+
+    Raises:
+        requests.HTTPError: If Pexels returns an error status.
+    """
+    key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+    cache = _load_api_cache()
+    entry = cache.get(key)
+    if entry and time.time() - entry["fetched_at"] < PEXELS_CACHE_TTL:
+        return entry["data"]
+
+    headers = {"Authorization": PEXELS_API_KEY}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    response = SESSION.get(url, headers=headers, params=params, timeout=15)
+
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        _save_api_cache(cache)
+        return entry["data"]
+
+    response.raise_for_status()
+    data = json_body(response)
+
+    cache[key] = {
+        "fetched_at": time.time(),
+        "etag": response.headers.get("ETag"),
+        "data": data,
+    }
+    _save_api_cache(cache)
+    return data
+
 
 def _fetch_pexels_videos(keyword: str, per_page: int = 15) -> list[dict]:
     """Query Pexels API for portrait videos matching a keyword."""
-    headers = {"Authorization": PEXELS_API_KEY}
     params = {
         "query": keyword,
         "orientation": "portrait",
         "size": "large",
         "per_page": per_page,
     }
-    response = requests.get(PEXELS_VIDEO_SEARCH_URL, headers=headers, params=params, timeout=15)
-    response.raise_for_status()
-    return response.json().get("videos", [])
+    return _get_json(PEXELS_VIDEO_SEARCH_URL, params).get("videos", [])
 
 
 def _get_best_video_file(video: dict) -> str | None:
@@ -56,37 +144,104 @@ def _get_best_video_file(video: dict) -> str | None:
     From a Pexels video object, return the URL of the best portrait file
     that meets the minimum resolution requirement.
     """
-    files = video.get("video_files", [])
-    # Filter for portrait files with sufficient resolution
-    portrait_files = [
-        f for f in files
-        if f.get("width", 0) >= MIN_WIDTH or f.get("height", 0) >= MIN_HEIGHT
-    ]
-    if not portrait_files:
-        # Fall back to any file with height >= width (portrait-ish)
-        portrait_files = [
-            f for f in files
-            if f.get("height", 0) >= f.get("width", 1)
-        ]
-    if not portrait_files:
-        return None
-
-    # Pick highest resolution
-    best = max(portrait_files, key=lambda f: f.get("height", 0) * f.get("width", 0))
-    return best.get("link")
+    # Single pass: track the highest-resolution file meeting the minimum
+    # resolution, and the highest-resolution portrait-ish file as a fallback.
+    best, best_area = None, -1
+    fallback, fallback_area = None, -1
+    for f in video.get("video_files", []):
+        width = f.get("width", 0)
+        height = f.get("height", 0)
+        area = width * height
+        if width >= MIN_WIDTH or height >= MIN_HEIGHT:
+            if area > best_area:
+                best, best_area = f, area
+        elif best is None and height >= f.get("width", 1) and area > fallback_area:
+            fallback, fallback_area = f, area
+
+    chosen = best or fallback
+    return chosen.get("link") if chosen else None
+
+
+def _stream_download(url: str, output_path: str) -> None:
+    """
+    Download a file to disk over a single streaming GET.
+
+    The body is copied from the raw urllib3 stream with shutil.copyfileobj,
+    skipping the per-chunk generator of iter_content.
+    """
+    with SESSION.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True  # Undo any Content-Encoding
+        with open(output_path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
+
+
+def _download_range(url: str, fd: int, start: int, end: int) -> bool:
+    """
+    Fetch bytes start..end (inclusive) of url and write them at the same
+    offset of fd.
+
+    Returns:
+        False if the server ignored the Range header (no 206), True otherwise.
+
+    Raises:
+        RuntimeError: If the server sent fewer bytes than requested.
+    """
+    headers = {"Range": f"bytes={start}-{end}"}
+    with SESSION.get(url, headers=headers, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            return False
+        offset = start
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            offset += os.pwrite(fd, chunk, offset)
+    if offset != end + 1:
+        raise RuntimeError(
+            f"[pexels_fetcher] Short read for bytes {start}-{end}: got {offset - start}."
+        )
+    return True
 
 
 def _download_video(url: str, output_path: str) -> None:
-    """Stream-download a video file to disk."""
-    response = requests.get(url, stream=True, timeout=60)
-    response.raise_for_status()
-    with open(output_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=1024 * 1024):
-            if chunk:
-                f.write(chunk)
+    """
+    Download a video file to disk.
+
+    When the CDN advertises byte ranges, the file is pre-allocated and fetched
+    as DOWNLOAD_WORKERS parallel Range requests over the pooled session, each
+    written in place with os.pwrite. Otherwise (or if any range request is
+    answered with a plain 200) it falls back to a single streaming GET.
+    """
+    # Pexels links redirect to the CDN; resolve once so the ranges skip the hop
+    head = SESSION.head(url, allow_redirects=True, timeout=15)
+    size = int(head.headers.get("Content-Length", 0)) if head.ok else 0
+    if head.headers.get("Accept-Ranges") != "bytes" or size < DOWNLOAD_MIN_PARALLEL_SIZE:
+        _stream_download(url, output_path)
+        return
 
+    final_url = head.url
+    part_size = -(-size // DOWNLOAD_WORKERS)  # ceil division
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
 
-def select_and_download_background() -> tuple[str, str]:
+    fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            results = list(
+                executor.map(lambda r: _download_range(final_url, fd, *r), ranges)
+            )
+    finally:
+        os.close(fd)
+
+    if not all(results):
+        print("[pexels_fetcher] Server ignored Range requests, using a single stream.")
+        _stream_download(final_url, output_path)
+
+
+def select_and_download_background(
+    output_path: str | None = None,
+    scores: dict | None = None,
+    cached_path: Callable[[str], str | None] | None = None,
+) -> tuple[str, str]:
     """
     Intelligently select and download a Pexels background video.
 
@@ -95,15 +250,31 @@ def select_and_download_background() -> tuple[str, str]:
     2. If any background has score >= HIGH_SCORE_THRESHOLD, try to re-download it.
     3. Otherwise, search Pexels with a random spiritual keyword.
     4. Score candidates: boost known high-performers, pick best.
-    5. Download to tmp/background.mp4.
+    5. Download to tmp/background.mp4 (or output_path), unless cached_path
+       already has a local copy of the chosen ID.
+
+    Args:
+        output_path: Where to save the video. Defaults to tmp/background.mp4.
+        scores:      Background performance scores {pexels_id: score}, as
+                     returned by logger.get_background_scores(). Callers
+                     selecting several backgrounds pass it once; loaded
+                     from the DB when omitted.
+        cached_path: Optional lookup returning a ready local file for a
+                     Pexels ID (e.g. composer.cached_background), or None.
+                     On a hit that file is returned and nothing is
+                     downloaded; for a known high performer even the
+                     details lookup is skipped.
 
     Returns:
-        Tuple of (pexels_id: str, local_path: str)
+        Tuple of (pexels_id: str, local_path: str). local_path is the
+        cached_path file on a cache hit, otherwise output_path.
     """
     os.makedirs(TMP_DIR, exist_ok=True)
-    output_path = os.path.join(TMP_DIR, "background.mp4")
+    if output_path is None:
+        output_path = os.path.join(TMP_DIR, "background.mp4")
 
-    scores = get_background_scores()
+    if scores is None:
+        scores = get_background_scores()
 
     # --- Strategy 1: Re-use a high-performing known background ---
     high_performers = {
@@ -116,15 +287,17 @@ def select_and_download_background() -> tuple[str, str]:
         best_id = max(high_performers, key=lambda k: high_performers[k])
         print(f"[pexels_fetcher] Re-using high-performing background ID: {best_id} (score={high_performers[best_id]})")
 
-        # Fetch its details from Pexels to get a fresh download URL
-        headers = {"Authorization": PEXELS_API_KEY}
-        resp = requests.get(
-            f"https://api.pexels.com/videos/videos/{best_id}",
-            headers=headers,
-            timeout=15,
-        )
-        if resp.status_code == 200:
-            video = resp.json()
+        local_path = cached_path(str(best_id)) if cached_path else None
+        if local_path:
+            print(f"[pexels_fetcher] Background {best_id} already cached, skipping download.")
+            return str(best_id), local_path
+
+        # Fetch its details from Pexels to get a download URL
+        try:
+            video = _get_json(f"https://api.pexels.com/videos/videos/{best_id}")
+        except requests.HTTPError:
+            video = None
+        if video:
             url = _get_best_video_file(video)
             if url:
                 print(f"[pexels_fetcher] Downloading background from Pexels...")
@@ -153,14 +326,23 @@ def select_and_download_background() -> tuple[str, str]:
         duration_score = min(v.get("duration", 0) / 60.0, 1.0)
         return known_score * 3.0 + duration_score
 
-    candidates.sort(key=candidate_score, reverse=True)
+    # Score each candidate once and heapify (O(n)) instead of sorting: the
+    # first pop usually has a valid file. The index breaks score ties in
+    # search order, as the stable sort did.
+    heap = [(-candidate_score(v), i, v) for i, v in enumerate(candidates)]
+    heapq.heapify(heap)
 
     # Pick the best candidate that has a valid portrait file
-    for video in candidates:
+    while heap:
+        _, _, video = heapq.heappop(heap)
         url = _get_best_video_file(video)
         if url:
             pexels_id = str(video["id"])
             print(f"[pexels_fetcher] Selected Pexels video ID: {pexels_id}")
+            local_path = cached_path(pexels_id) if cached_path else None
+            if local_path:
+                print(f"[pexels_fetcher] Background {pexels_id} already cached, skipping download.")
+                return pexels_id, local_path
             print(f"[pexels_fetcher] Downloading background...")
             _download_video(url, output_path)
             return pexels_id, output_path
@@ -0,0 +1,74 @@
+"""
+process_runner.py – Runs external tools (FFmpeg, yt-dlp) while streaming
+their stderr instead of buffering it all in memory.
+
+Only the last TAIL_LINES lines are kept, which is all that is needed to
+report a failure.
+"""
+
+import os
+import shutil
+import subprocess
+from collections import deque
+from typing import Callable
+
+TAIL_LINES = 200
+PIPE_BUFSIZE = 1 << 20  # 1 MB
+
+# Shared by every FFmpeg caller (composer, background_remover)
+DEBUG = bool(os.environ.get("DEBUG"))
+
+# The filter graph runs single-threaded unless told otherwise. Over-subscribing
+# alongside the encoder threads is fine: x264's fast presets leave cores idle.
+FILTER_THREADS = str(os.cpu_count() or 1)
+
+
+def resolve_tool(name: str) -> str:
+    """
+    Resolve an executable on PATH once, so later runs skip the PATH search.
+
+    Raises:
+        RuntimeError: If the executable is not installed, so the pipeline
+                      fails at start-up instead of halfway through.
+    """
+    path = shutil.which(name)
+    if path is None:
+        raise RuntimeError(f"[process_runner] {name} not found on PATH.")
+    return path
+
+
+def run(
+    cmd: list[str],
+    tag: str,
+    tool: str = "FFmpeg",
+    on_line: Callable[[str], None] | None = None,
+) -> None:
+    """
+    Run a command, streaming its stderr line by line.
+
+    Args:
+        cmd:     Command argv.
+        tag:     Module name used in the error message, e.g. "composer".
+        tool:    Tool name used in the error message. Default "FFmpeg".
+        on_line: Optional callback invoked with every stderr line.
+
+    Raises:
+        RuntimeError: If the command exits non-zero. The message contains the
+                      last TAIL_LINES lines of stderr.
+    """
+    tail = deque(maxlen=TAIL_LINES)
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        bufsize=PIPE_BUFSIZE,
+        text=True,
+    ) as proc:
+        for line in proc.stderr:
+            line = line.rstrip("\n")
+            if on_line:
+                on_line(line)
+            tail.append(line)
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"[{tag}] {tool} failed:\n" + "\n".join(tail))
@@ -2,14 +2,23 @@
 uploader.py – Uploads the final video to YouTube, Instagram (Reels), and TikTok.
 
 All credentials are read from environment variables (GitHub Secrets).
+upload_all() runs the three independent platform uploads concurrently.
 """
 
+import mmap
 import os
+import random
 import time
-import requests
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.credentials import Credentials
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from http_session import create_session, json_body
+
+# The Google client libraries are slow to import; they are loaded inside the
+# YouTube functions so Instagram/TikTok-only callers never pay for them.
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 # ─── Environment Variables ────────────────────────────────────────────────────
 YOUTUBE_CLIENT_ID = os.environ.get("YOUTUBE_CLIENT_ID", "")
@@ -24,11 +33,44 @@ TIKTOK_ACCESS_TOKEN = os.environ.get("TIKTOK_ACCESS_TOKEN", "")
 GRAPH_API_BASE = "https://graph.facebook.com/v19.0"
 TIKTOK_API_BASE = "https://open.tiktokapis.com/v2"
 
+# Status polling: start fast and back off exponentially (plus jitter), so a
+# video that is ready after a few seconds is not held back by a fixed interval
+POLL_INITIAL_DELAY = 2.0
+POLL_MAX_DELAY = 15.0
+POLL_BACKOFF = 1.5
+
+# Videos below this size go to YouTube in one multipart request; larger ones
+# use a resumable upload in YOUTUBE_CHUNK_SIZE chunks
+YOUTUBE_SIMPLE_UPLOAD_MAX = 25 * 1024 * 1024
+YOUTUBE_CHUNK_SIZE = 5 * 1024 * 1024
+
+# Pooled keep-alive sessions: the status polling loops reuse one connection
+# instead of handshaking on every poll. One session per platform, so uploads
+# running in parallel threads (see upload_all) never share a session.
+INSTAGRAM_SESSION = create_session(pool_connections=10, pool_maxsize=20)
+TIKTOK_SESSION = create_session(pool_connections=10, pool_maxsize=20)
+
+
+@contextmanager
+def _mapped_file(path: str):
+    """
+    Memory-map a file for upload and yield it as a memoryview.
+
+    requests sets Content-Length from the view and hands it to the socket as
+    a single buffer, instead of reading the file object in 8 KB chunks.
+    """
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+            memoryview(mapped) as view:
+        yield view
+
 
 # ─── YouTube ──────────────────────────────────────────────────────────────────
 
-def _get_youtube_credentials() -> Credentials:
+def _get_youtube_credentials() -> "Credentials":
     """Build OAuth2 credentials from stored refresh token."""
+    from google.oauth2.credentials import Credentials
+
     creds = Credentials(
         token=None,
         refresh_token=YOUTUBE_REFRESH_TOKEN,
@@ -51,9 +93,13 @@ def upload_youtube(video_path: str, metadata: dict) -> str:
     Returns:
         YouTube video ID of the uploaded video.
     """
+    from googleapiclient.http import MediaFileUpload
+
+    from youtube_client import build_client
+
     print("[uploader] Uploading to YouTube...")
     creds = _get_youtube_credentials()
-    youtube = build("youtube", "v3", credentials=creds)
+    youtube = build_client(credentials=creds)
 
     body = {
         "snippet": {
@@ -69,11 +115,14 @@ def upload_youtube(video_path: str, metadata: dict) -> str:
         },
     }
 
+    # A Short is usually well under the limit: a single request saves the
+    # session-initiation round-trip and the per-chunk requests
+    resumable = os.path.getsize(video_path) >= YOUTUBE_SIMPLE_UPLOAD_MAX
     media = MediaFileUpload(
         video_path,
         mimetype="video/mp4",
-        resumable=True,
-        chunksize=1024 * 1024 * 5,  # 5 MB chunks
+        resumable=resumable,
+        chunksize=YOUTUBE_CHUNK_SIZE,
     )
 
     request = youtube.videos().insert(
@@ -82,12 +131,15 @@ def upload_youtube(video_path: str, metadata: dict) -> str:
         media_body=media,
     )
 
-    response = None
-    while response is None:
-        status, response = request.next_chunk()
-        if status:
-            pct = int(status.progress() * 100)
-            print(f"[uploader] YouTube upload progress: {pct}%")
+    if resumable:
+        response = None
+        while response is None:
+            status, response = request.next_chunk()
+            if status:
+                pct = int(status.progress() * 100)
+                print(f"[uploader] YouTube upload progress: {pct}%")
+    else:
+        response = request.execute()
 
     yt_video_id = response.get("id", "")
     print(f"[uploader] YouTube upload complete. Video ID: {yt_video_id}")
@@ -135,9 +187,9 @@ def upload_instagram(video_path: str, metadata: dict) -> str:
         "share_to_feed": True,
         "access_token": INSTAGRAM_ACCESS_TOKEN,
     }
-    init_resp = requests.post(init_url, data=init_payload, timeout=30)
+    init_resp = INSTAGRAM_SESSION.post(init_url, data=init_payload, timeout=30)
     init_resp.raise_for_status()
-    container_id = init_resp.json().get("id")
+    container_id = json_body(init_resp).get("id")
     print(f"[uploader] Instagram container created: {container_id}")
 
     # Step 2: Upload video bytes to the container
@@ -148,8 +200,8 @@ def upload_instagram(video_path: str, metadata: dict) -> str:
         "offset": "0",
         "file_size": str(file_size),
     }
-    with open(video_path, "rb") as f:
-        upload_resp = requests.post(upload_url, headers=headers, data=f, timeout=120)
+    with _mapped_file(video_path) as body:
+        upload_resp = INSTAGRAM_SESSION.post(upload_url, headers=headers, data=body, timeout=120)
     upload_resp.raise_for_status()
     print(f"[uploader] Instagram video bytes uploaded.")
 
@@ -162,33 +214,36 @@ def upload_instagram(video_path: str, metadata: dict) -> str:
         "creation_id": container_id,
         "access_token": INSTAGRAM_ACCESS_TOKEN,
     }
-    pub_resp = requests.post(publish_url, data=publish_payload, timeout=30)
+    pub_resp = INSTAGRAM_SESSION.post(publish_url, data=publish_payload, timeout=30)
     pub_resp.raise_for_status()
-    media_id = pub_resp.json().get("id", "")
+    media_id = json_body(pub_resp).get("id", "")
     print(f"[uploader] Instagram Reel published. Media ID: {media_id}")
     return media_id
 
 
 def _instagram_wait_for_ready(container_id: str, max_wait: int = 300) -> None:
-    """Poll Instagram until the media container finishes processing."""
+    """Poll Instagram (with exponential backoff) until the media container finishes processing."""
     check_url = f"{GRAPH_API_BASE}/{container_id}"
     params = {
         "fields": "status_code,status",
         "access_token": INSTAGRAM_ACCESS_TOKEN,
     }
-    elapsed = 0
+    elapsed = 0.0
+    delay = POLL_INITIAL_DELAY
     while elapsed < max_wait:
-        resp = requests.get(check_url, params=params, timeout=15)
+        resp = INSTAGRAM_SESSION.get(check_url, params=params, timeout=15)
         resp.raise_for_status()
-        data = resp.json()
+        data = json_body(resp)
         status_code = data.get("status_code", "")
         print(f"[uploader] Instagram container status: {status_code}")
         if status_code == "FINISHED":
             return
         if status_code == "ERROR":
             raise RuntimeError(f"[uploader] Instagram processing error: {data}")
-        time.sleep(10)
-        elapsed += 10
+        sleep_for = delay + random.uniform(0, 0.5)
+        time.sleep(sleep_for)
+        elapsed += sleep_for
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
     raise TimeoutError("[uploader] Instagram media processing timed out.")
 
 
@@ -238,9 +293,9 @@ def upload_tiktok(video_path: str, metadata: dict) -> str:
             "total_chunk_count": 1,
         },
     }
-    init_resp = requests.post(init_url, headers=headers, json=init_body, timeout=30)
+    init_resp = TIKTOK_SESSION.post(init_url, headers=headers, json=init_body, timeout=30)
     init_resp.raise_for_status()
-    init_data = init_resp.json().get("data", {})
+    init_data = json_body(init_resp).get("data", {})
     publish_id = init_data.get("publish_id")
     upload_url = init_data.get("upload_url")
     print(f"[uploader] TikTok publish_id: {publish_id}")
@@ -250,8 +305,8 @@ def upload_tiktok(video_path: str, metadata: dict) -> str:
         "Content-Range": f"bytes 0-{file_size - 1}/{file_size}",
         "Content-Type": "video/mp4",
     }
-    with open(video_path, "rb") as f:
-        upload_resp = requests.put(upload_url, headers=chunk_headers, data=f, timeout=120)
+    with _mapped_file(video_path) as body:
+        upload_resp = TIKTOK_SESSION.put(upload_url, headers=chunk_headers, data=body, timeout=120)
     upload_resp.raise_for_status()
     print(f"[uploader] TikTok video bytes uploaded.")
 
@@ -263,28 +318,82 @@ def upload_tiktok(video_path: str, metadata: dict) -> str:
 
 
 def _tiktok_wait_for_publish(publish_id: str, max_wait: int = 300) -> None:
-    """Poll TikTok until the video is published."""
+    """Poll TikTok (with exponential backoff) until the video is published."""
     status_url = f"{TIKTOK_API_BASE}/post/publish/status/fetch/"
     headers = {
         "Authorization": f"Bearer {TIKTOK_ACCESS_TOKEN}",
         "Content-Type": "application/json; charset=UTF-8",
     }
-    elapsed = 0
+    elapsed = 0.0
+    delay = POLL_INITIAL_DELAY
     while elapsed < max_wait:
-        resp = requests.post(
+        resp = TIKTOK_SESSION.post(
             status_url,
             headers=headers,
             json={"publish_id": publish_id},
             timeout=15,
         )
         resp.raise_for_status()
-        data = resp.json().get("data", {})
+        data = json_body(resp).get("data", {})
         status = data.get("status", "")
         print(f"[uploader] TikTok publish status: {status}")
         if status in ("PUBLISH_COMPLETE", "SUCCESS"):
             return
         if status in ("FAILED", "PUBLISH_FAILED"):
             raise RuntimeError(f"[uploader] TikTok publish failed: {data}")
-        time.sleep(10)
-        elapsed += 10
+        sleep_for = delay + random.uniform(0, 0.5)
+        time.sleep(sleep_for)
+        elapsed += sleep_for
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
     raise TimeoutError("[uploader] TikTok publish timed out.")
+
+
+# ─── All platforms ────────────────────────────────────────────────────────────
+
+def upload_all(video_path: str, metadata: dict) -> dict:
+    """
+    Upload a video to every platform that has credentials, concurrently.
+
+    The uploads are independent and I/O-bound (upload, then minutes of status
+    polling), so running them in parallel makes the total time the slowest
+    platform instead of the sum of all three. A failure on one platform is
+    reported and does not affect the others.
+
+    Args:
+        video_path: Path to final.mp4.
+        metadata:   Dict from metadata_generator.generate_metadata().
+
+    Returns:
+        Dict {platform: video/media/publish ID, or None if the upload failed}.
+    """
+    uploads = {}
+    if all([YOUTUBE_CLIENT_ID, YOUTUBE_CLIENT_SECRET, YOUTUBE_REFRESH_TOKEN]):
+        uploads["YouTube"] = upload_youtube
+    else:
+        print("[uploader] ⏩ Skipping YouTube: Credentials missing.")
+    if all([INSTAGRAM_ACCESS_TOKEN, INSTAGRAM_ACCOUNT_ID]):
+        uploads["Instagram"] = upload_instagram
+    else:
+        print("[uploader] ⏩ Skipping Instagram: Credentials missing.")
+    if TIKTOK_ACCESS_TOKEN:
+        uploads["TikTok"] = upload_tiktok
+    else:
+        print("[uploader] ⏩ Skipping TikTok: Credentials missing.")
+
+    results = {}
+    if not uploads:
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+        futures = {
+            executor.submit(upload, video_path, metadata): platform
+            for platform, upload in uploads.items()
+        }
+        for future in as_completed(futures):
+            platform = futures[future]
+            try:
+                results[platform] = future.result()
+            except Exception as e:
+                print(f"[uploader] ⚠️  {platform} upload failed: {e}")
+                results[platform] = None
+    return results
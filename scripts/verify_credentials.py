@@ -4,17 +4,24 @@ and tokens stored in the .env file.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import requests
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+# Google client libraries are imported inside the YouTube verifiers, since
+# they are slow to load and not needed for the other checks.
 # Load .env manually to avoid dependency issues
 def load_env_manual():
-    if os.path.exists(".env"):
-        with open(".env", "r") as f:
-            for line in f:
-                if "=" in line and not line.startswith("#"):
-                    k, v = line.strip().split("=", 1)
-                    os.environ[k] = v
+    # In CI the credentials come from GitHub Secrets; there is no .env to read
+    if os.getenv("CI"):
+        return
+    env_file = Path(".env")
+    if not env_file.exists():
+        return
+    for line in env_file.read_text().splitlines():
+        if "=" in line and not line.startswith("#"):
+            k, v = line.strip().split("=", 1)
+            os.environ[k] = v
 
 load_env_manual()
 
@@ -23,7 +30,9 @@ def verify_youtube_api():
     if not key or "YOUR_" in key:
         return "❌ Missing"
     try:
-        youtube = build("youtube", "v3", developerKey=key)
+        from youtube_client import build_client
+
+        youtube = build_client(developerKey=key)
         youtube.search().list(q="test", part="id", maxResults=1).execute()
         return "✅ Working"
     except Exception as e:
@@ -38,6 +47,10 @@ def verify_youtube_oauth():
     if not refresh_token: return "⏳ Refresh Token Missing (Upload will fail)"
     
     try:
+        from google.oauth2.credentials import Credentials
+
+        from youtube_client import build_client
+
         creds = Credentials(
             token=None,
             refresh_token=refresh_token,
@@ -45,7 +58,7 @@ def verify_youtube_oauth():
             client_id=client_id,
             client_secret=client_secret,
         )
-        youtube = build("youtube", "v3", credentials=creds)
+        youtube = build_client(credentials=creds)
         youtube.channels().list(mine=True, part="id").execute()
         return "✅ Working (Ready for upload)"
     except Exception as e:
@@ -83,10 +96,18 @@ def main():
     print("=" * 60)
     print("🔍 API Credential Verification")
     print("=" * 60)
-    print(f"YouTube Search API:   {verify_youtube_api()}")
-    print(f"YouTube Upload OAuth: {verify_youtube_oauth()}")
-    print(f"Pexels API:           {verify_pexels()}")
-    print(f"Instagram Graph API:  {verify_instagram()}")
+    # The checks are independent network calls: run them concurrently, then
+    # print in a fixed order
+    checks = [
+        ("YouTube Search API:  ", verify_youtube_api),
+        ("YouTube Upload OAuth:", verify_youtube_oauth),
+        ("Pexels API:          ", verify_pexels),
+        ("Instagram Graph API: ", verify_instagram),
+    ]
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        results = list(executor.map(lambda check: check[1](), checks))
+    for (label, _), result in zip(checks, results):
+        print(f"{label} {result}")
     print("=" * 60)
     print("\nTikTok Verification: Manual (requires approved app)")
 
@@ -0,0 +1,47 @@
+"""
+youtube_client.py – Shared YouTube Data API client construction.
+
+Building a client parses the discovery document, so the search
+(youtube_fetcher) and validation (license_validator) steps share one
+API-key instance per process.
+
+The discovery document is the static copy bundled with google-api-python-client;
+it is read from disk once per process and every client (API key or OAuth) is
+built from it with build_from_document, so no build ever fetches or re-reads it.
+"""
+
+import functools
+import os
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+
+@functools.lru_cache(maxsize=1)
+def _discovery_document() -> str:
+    """
+    Return the bundled YouTube Data API v3 discovery document.
+
+    Raises:
+        RuntimeError: If the installed google-api-python-client does not ship it.
+    """
+    document = get_static_doc("youtube", "v3")
+    if document is None:
+        raise RuntimeError("[youtube_client] Bundled youtube v3 discovery document not found.")
+    return document
+
+
+def build_client(**kwargs):
+    """
+    Build a YouTube Data API v3 client from the cached discovery document.
+
+    Args:
+        **kwargs: Passed to build_from_document, e.g. developerKey= or credentials=.
+    """
+    return build_from_document(_discovery_document(), **kwargs)
+
+
+@functools.lru_cache(maxsize=1)
+def get_api_client():
+    """Return the process-wide YouTube Data API v3 client (API-key auth)."""
+    return build_client(developerKey=os.environ["YOUTUBE_API_KEY"])
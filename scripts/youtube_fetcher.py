@@ -3,22 +3,37 @@ youtube_fetcher.py – Searches YouTube for Creative Commons Quran recitation vi
 under 60 seconds and returns their metadata.
 """
 
-import os
-import isodate
-from googleapiclient.discovery import build
+import re
+
+from youtube_client import get_api_client
 
-YOUTUBE_API_KEY = os.environ["YOUTUBE_API_KEY"]
 SEARCH_QUERY = "Quran recitation"
 MAX_RESULTS = 20  # Fetch more than needed so we have fallbacks after filtering
 
+# Partial responses: ask only for the fields we read, so the API sends (and we
+# parse) a fraction of the full snippet/contentDetails/status payload.
+SEARCH_FIELDS = "items(id(kind,videoId),snippet/liveBroadcastContent)"
+DETAILS_FIELDS = (
+    "items(id,snippet(title,channelTitle,liveBroadcastContent),"
+    "contentDetails(duration,licensedContent,contentRating/ytRating),"
+    "status/embeddable)"
+)
 
-def _build_client():
-    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+# Fast path for the durations YouTube actually returns for short videos
+_DURATION_RE = re.compile(r"^PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$")
 
 
 def _parse_duration_seconds(iso_duration: str) -> int:
     """Convert ISO 8601 duration string to total seconds."""
+    match = _DURATION_RE.match(iso_duration)
+    if match:
+        hours, minutes, seconds = (int(v or 0) for v in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+
+    # Rare forms (days, fractional seconds) go through the full parser
     try:
+        import isodate
+
         return int(isodate.parse_duration(iso_duration).total_seconds())
     except Exception:
         return 9999  # Treat unparseable durations as too long
@@ -31,7 +46,7 @@ def fetch_quran_videos() -> list[dict]:
     Returns:
         List of dicts: {videoId, title, channelTitle, duration_seconds}
     """
-    youtube = _build_client()
+    youtube = get_api_client()
 
     # Step 1: Search with CC license filter and short duration hint
     search_response = (
@@ -45,14 +60,17 @@ def fetch_quran_videos() -> list[dict]:
             maxResults=MAX_RESULTS,
             relevanceLanguage="ar",
             safeSearch="strict",
+            fields=SEARCH_FIELDS,
         )
         .execute()
     )
 
+    # Drop live/upcoming broadcasts here so they never reach the details call
     video_ids = [
         item["id"]["videoId"]
         for item in search_response.get("items", [])
         if item["id"].get("kind") == "youtube#video"
+        and item.get("snippet", {}).get("liveBroadcastContent", "none") == "none"
     ]
 
     if not video_ids:
@@ -65,6 +83,7 @@ def fetch_quran_videos() -> list[dict]:
         .list(
             id=",".join(video_ids),
             part="id,snippet,contentDetails,status",
+            fields=DETAILS_FIELDS,
         )
         .execute()
     )